@@ -32,13 +32,14 @@ from QOpenScienceFramework import connection as osf
 
 import os
 import sys
+import errno
+import stat
+import time
 import json
+import functools
 import warnings
 import tempfile
 import hashlib
-import arrow
-import humanize
-import shutil
 import requests
 import six
 from libopensesame.oslogging import oslogger
@@ -49,6 +50,27 @@ if hasattr(json, u'JSONDecodeError'):
 else:
     JSONDecodeError = ValueError
 
+# Use orjson to parse replies if it is installed. It is faster than the json
+# module and parses bytes directly, so replies don't need to be decoded first.
+# Its JSONDecodeError is a subclass of json.JSONDecodeError.
+try:
+    import orjson
+except ImportError:
+    def json_loads(data):
+        return json.loads(safe_decode(data))
+else:
+    json_loads = orjson.loads
+
+# os.replace() is not available in Python 2. There, os.rename() replaces an
+# existing file as well, except on Windows.
+if hasattr(os, u'replace'):
+    replace_file = os.replace
+else:
+    def replace_file(src, dst):
+        if os.name == u'nt' and os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
+
 _ = translation_context(u'OpenScienceFramework', category=u'extension')
 
 __author__ = u"Daniel Schreij"
@@ -66,12 +88,18 @@ def hashfile(path, hasher, blocksize=65536):
     hasher : hashlib.HASH
             Hashing object, such as returned by hashlib.md5() or hashlib.sha256()
     blocksize : int (default: 65536)
-            The size of the buffer to allocate for reading in the file
+            The size of the buffer to allocate for reading in the file. This
+            is only used if hashlib.file_digest() is not available (before
+            Python 3.11), which chooses its own buffer size.
 
     Returns:
     UUID : the hasher.hexdigest() contents, which is a UUID object
     """
     with open(os.path.abspath(path), 'rb') as afile:
+        # Python 3.11+ reads the file into a single reusable buffer (and
+        # chooses its own blocksize) instead of allocating a block per read
+        if hasattr(hashlib, 'file_digest'):
+            return hashlib.file_digest(afile, lambda: hasher).hexdigest()
         buf = afile.read(blocksize)
         while len(buf) > 0:
             hasher.update(buf)
@@ -79,6 +107,162 @@ def hashfile(path, hasher, blocksize=65536):
     return hasher.hexdigest()
 
 
+# Results of is_opensesame_file(), as {(filename, os3_only): bool}
+_opensesame_file_cache = {}
+_opensesame_file_cache_size = 4096
+
+
+def is_opensesame_file(filename, os3_only=False):
+    """ Checks if filename is the name of an OpenSesame experiment. This is a
+    cached version of util.check_if_opensesame_file, which is called for every
+    item that is selected in the project tree.
+
+    Parameters
+    ----------
+    filename : str
+            The name of the file to check
+    os3_only : bool (default: False)
+            Only accept the .osexp format of OpenSesame 3 and later
+
+    Returns
+    -------
+    bool : True if filename is the name of an OpenSesame experiment
+    """
+    key = (filename, os3_only)
+    try:
+        return _opensesame_file_cache[key]
+    except KeyError:
+        pass
+    # Start over instead of growing without bounds
+    if len(_opensesame_file_cache) >= _opensesame_file_cache_size:
+        _opensesame_file_cache.clear()
+    result = util.check_if_opensesame_file(filename, os3_only)
+    _opensesame_file_cache[key] = result
+    return result
+
+
+class FileHasherSignals(QtCore.QObject):
+    """ Passes the results of FileHasher runnables on to the GUI thread. This
+    object should be created in the GUI thread. """
+
+    # The path of the file, and its hexdigest or None if it couldn't be read
+    hashed = QtCore.Signal(object, object)
+
+
+class FileHasher(QtCore.QRunnable):
+    """ Creates the sha256 hash of a file in a worker thread, so that hashing
+    large files doesn't block the GUI. hashlib releases the GIL while hashing,
+    so several files can be hashed in parallel. """
+
+    def __init__(self, path, signals):
+        """ Constructor
+
+        Parameters
+        ----------
+        path : str
+            The path to the file to hash
+        signals : FileHasherSignals
+            The object through which the hash is emitted
+        """
+        super(FileHasher, self).__init__()
+        self.path = path
+        self.signals = signals
+
+    def run(self):
+        """ Hashes the file and emits the result """
+        try:
+            digest = hashfile(self.path, hashlib.sha256())
+        except (IOError, OSError) as e:
+            warnings.warn(u'Could not hash {}: {}'.format(self.path, e))
+            digest = None
+        self.signals.hashed.emit(self.path, digest)
+
+
+class TokenWriter(QtCore.QRunnable):
+    """ Writes the OAuth token to the token file in a worker thread. The token
+    is first written to a temporary file, which then replaces the token file,
+    so that the token file is never left half-written. """
+
+    def __init__(self, tokenfile, token):
+        """ Constructor
+
+        Parameters
+        ----------
+        tokenfile : str
+            The path of the file to write the token to
+        token : dict
+            The OAuth token
+        """
+        super(TokenWriter, self).__init__()
+        self.tokenfile = tokenfile
+        self.token = token
+
+    def run(self):
+        """ Writes the token to the token file """
+        # A stored token is restored on startup, after which the login event
+        # would write the same token again
+        try:
+            with open(self.tokenfile) as fp:
+                if json.load(fp) == self.token:
+                    return
+        except (IOError, OSError, JSONDecodeError):
+            pass
+        # Use a unique temporary file in the same folder, so that it is on the
+        # same file system as the token file and replacing it is atomic
+        token_dir = os.path.dirname(os.path.abspath(self.tokenfile))
+        try:
+            fd, tmp_file = tempfile.mkstemp(prefix=u'.OS_OSF', dir=token_dir)
+        except (IOError, OSError) as e:
+            oslogger.warning(u'Could not store OSF token: {}'.format(e))
+            return
+        try:
+            with os.fdopen(fd, 'w') as fp:
+                json.dump(self.token, fp, separators=(',', ':'))
+            replace_file(tmp_file, self.tokenfile)
+        except Exception as e:
+            # Don't leave the temporary file behind, whatever went wrong
+            oslogger.warning(u'Could not store OSF token: {}'.format(e))
+            try:
+                os.unlink(tmp_file)
+            except OSError:
+                pass
+
+
+class TokenFileListener(events.TokenFileListener):
+    """ Writes the token to the token file after login, without blocking the
+    GUI thread, and removes the token file after logout. """
+
+    def __init__(self, tokenfile):
+        """ Constructor
+
+        Parameters
+        ----------
+        tokenfile : str
+            The path of the file to store the token in
+        """
+        super(TokenFileListener, self).__init__(tokenfile)
+        # A single thread, so that the token is written in order
+        self._pool = QtCore.QThreadPool()
+        self._pool.setMaxThreadCount(1)
+
+    def handle_login(self):
+        """ Stores the token of the current session in the token file """
+        if not osf.session.token:
+            oslogger.error(u'Could not find authentication token')
+            return
+        self._pool.start(TokenWriter(self.tokenfile, dict(osf.session.token)))
+
+    def handle_logout(self):
+        """ Removes the token file, after any pending write has finished """
+        self._pool.waitForDone()
+        try:
+            os.unlink(self.tokenfile)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                oslogger.warning(
+                    u'Could not remove OSF token file: {}'.format(e))
+
+
 class Notifier(QtCore.QObject):
     """ Sends on messages to the notifier extension or shows a dialog box if
     it is not available """
@@ -213,6 +397,10 @@ class VersionChoiceDialog(QtWidgets.QDialog):
 
     def __setup_ui(self):
         """ Creates the GUI elements """
+        # Only needed when the dialog is shown, so not imported at startup
+        import arrow
+        import humanize
+
         self.setLayout(QtWidgets.QVBoxLayout())
         # Message label
         message_layout = QtWidgets.QHBoxLayout()
@@ -326,6 +514,12 @@ class VersionChoiceDialog(QtWidgets.QDialog):
 
 
 class OpenScienceFramework(base_extension):
+    # Number of seconds during which retrieved file info is reused
+    file_info_ttl = 30
+    # Files smaller than this number of bytes are uploaded without showing a
+    # progress dialog
+    progress_dialog_threshold = 256 * 1024
+
     # public functions
     def set_linked_experiment(self, osf_node):
         """ Displays the information of experiment on OSF to which the opened
@@ -340,12 +534,15 @@ class OpenScienceFramework(base_extension):
         if osf_node is None:
             self.linked_experiment_value.setText(_(u"Not linked"))
             self.button_unlink_experiment.setDisabled(True)
-            self.widget_autosave_experiment.setDisabled(True)
-            self.checkbox_autosave_experiment.setCheckState(
-                QtCore.Qt.Unchecked)
+            if self.widget_autosave_experiment is not None:
+                self.widget_autosave_experiment.setDisabled(True)
+                self.checkbox_autosave_experiment.setCheckState(
+                    QtCore.Qt.Unchecked)
         else:
             self.linked_experiment_value.setText(osf_node)
             self.button_unlink_experiment.setDisabled(False)
+            if self.widget_autosave_experiment is None:
+                self.__add_autosave_experiment_widget()
             self.widget_autosave_experiment.setDisabled(False)
 
     def set_linked_experiment_datanode(self, osf_node):
@@ -361,11 +558,14 @@ class OpenScienceFramework(base_extension):
         if osf_node is None:
             self.linked_data_value.setText(_(u"Not linked"))
             self.button_unlink_data.setDisabled(True)
-            self.widget_autosave_data.setDisabled(True)
-            self.checkbox_autosave_data.setCheckState(QtCore.Qt.Unchecked)
+            if self.widget_autosave_data is not None:
+                self.widget_autosave_data.setDisabled(True)
+                self.checkbox_autosave_data.setCheckState(QtCore.Qt.Unchecked)
         else:
             self.linked_data_value.setText(osf_node)
             self.button_unlink_data.setDisabled(False)
+            if self.widget_autosave_data is None:
+                self.__add_autosave_data_widget()
             self.widget_autosave_data.setDisabled(False)
 
     def verify_linked_experiment_status(self):
@@ -391,7 +591,7 @@ class OpenScienceFramework(base_extension):
             # If osf_id is nonexistent, the manager.get function will display an
             # error on its own, so just simply pass a lambda function for the
             # callback (we don't need to do anything with that data.)
-            self.manager.get(
+            self.__get_file_info(
                 osf_url,
                 lambda x: None
             )
@@ -423,7 +623,7 @@ class OpenScienceFramework(base_extension):
             # If osf_id is nonexistent, the manager.get function will display an
             # error on its own, so just simply pass a lambda function for the
             # callback (we don't need to do anything with that data.)
-            self.manager.get(
+            self.__get_file_info(
                 osf_url,
                 lambda x: None
             )
@@ -472,12 +672,16 @@ class OpenScienceFramework(base_extension):
                 structure as specified by the OSF API.
         """
         # If a QNetworkReply is passed, convert its data to a dict
-        if isinstance(data, QtNetwork.QNetworkReply):
-            data = json.loads(safe_decode(data.readAll().data()))
+        data = self.__parse_reply(data)
 
-        # Check validity of the currently opened file
+        # Check validity of the currently opened file. The result of this
+        # single stat call is reused below for the size and modification time.
         local_file = self.main_window.current_path
-        if local_file and not os.path.isfile(local_file) or local_file is None:
+        try:
+            local_stat = os.stat(local_file) if local_file else None
+        except OSError:
+            local_stat = None
+        if local_stat is None or not stat.S_ISREG(local_stat.st_mode):
             warnings.warn('No valid file specified')
             return
 
@@ -488,15 +692,25 @@ class OpenScienceFramework(base_extension):
             raise osf.OSFInvalidResponse("Unable to retrieve remote hash for "
                                          " experiment: {}".format(e))
 
-        # Create a sha256 hash for the currently opened experiment
-        local_hash = hashfile(local_file, hashlib.sha256())
-
         # Sync check is being done now, so set this flag to False before the first
         # return is encountered.
         self.sync_check_required = False
 
+        # If the sizes differ, the versions differ too, so there is no need to
+        # hash the local file. Some providers do not report the size, in which
+        # case only the hashes can be compared.
+        remote_size = data['data']['attributes'].get('size')
+        if remote_size is not None and remote_size != local_stat.st_size:
+            oslogger.debug(u'Local and remote experiment sizes differ, '
+                           u'skipping hash comparison')
+            in_sync = False
+        else:
+            # Create a sha256 hash for the currently opened experiment
+            local_hash = hashfile(local_file, hashlib.sha256())
+            in_sync = remote_hash == local_hash
+
         # If hashes are the same, then remote and local versions are the same
-        if remote_hash == local_hash:
+        if in_sync:
             self.notifier.info(_(u"In sync"), _(u"Experiment is synchronized with "
                                                 "the Open Science Framework"))
             return
@@ -512,6 +726,8 @@ class OpenScienceFramework(base_extension):
         except KeyError as e:
             raise osf.OSFInvalidResponse("Unable to retrieve remote file info of"
                                          " experiment: {}".format(e))
+        # Only needed when the versions differ, so not imported at startup
+        import arrow
         # Create an arrow time object converted to the local timezone
         remote_modified = arrow.get(remote_modified).to('local')
 
@@ -519,9 +735,9 @@ class OpenScienceFramework(base_extension):
         # name
         local_name = os.path.basename(local_file)
         # size
-        local_size = os.path.getsize(local_file)
+        local_size = local_stat.st_size
         # last modified time
-        local_modified = arrow.get(os.path.getmtime(local_file)).to('local')
+        local_modified = arrow.get(local_stat.st_mtime).to('local')
 
         local_info = {
             'name': local_name,
@@ -543,12 +759,11 @@ class OpenScienceFramework(base_extension):
             remote_version_info=remote_info,
         )
 
-        choice = 0
-        while not choice:
-            choice = choice_dialog.exec_()
-
-        # If use closes dialog with close button, 0 will be returned...
-        if choice == choice_dialog.USE_LOCAL:
+        # If the dialog is dismissed in another way than by clicking one of
+        # the buttons (e.g. by pressing Escape) 0 is returned. Treat that as
+        # the safe choice of keeping the version on this computer.
+        choice = choice_dialog.exec_()
+        if choice != choice_dialog.USE_REMOTE:
             # If local version should be used, then we're done here
             return
 
@@ -577,8 +792,11 @@ class OpenScienceFramework(base_extension):
                 # Ask user again if he or she wants to make a backup
                 if not destination:
                     continue
-                # Copy the current experiment to the new path
-                shutil.copy(self.main_window.current_path, destination)
+                # Copy the current experiment to the new path. Only the
+                # contents are needed, and copyfile lets the kernel copy them
+                # directly where possible.
+                import shutil
+                shutil.copyfile(self.main_window.current_path, destination)
                 break
 
         # Download the version from the OSF and open it. Show a progress dialog
@@ -626,17 +844,20 @@ class OpenScienceFramework(base_extension):
         remark column. Used to show which treewidget items represent a linked
         experiment or data folder. """
         # Make all but the last columns to bold
-        columns = self.project_tree.columnCount()
+        columns = self._column_count
+        updates_enabled = self.project_tree.updatesEnabled()
+        self.project_tree.setUpdatesEnabled(False)
         try:
-            font = item.font(0)
-            font.setBold(True)
+            # The item is already italic if it is the parent of a linked item
+            if item.font(0).italic():
+                font = self._bold_italic_font
+            else:
+                font = self._bold_font
             for i in range(columns-2):
                 item.setFont(i, font)
             # Last column contains remark_text. Make it italic
             item.setText(columns-1, remark_text)
-            font = item.font(columns-1)
-            font.setItalic(True)
-            item.setFont(columns-1, font)
+            item.setFont(columns-1, self._italic_font)
 
             # Make all parent items italic
             parent = item.parent()
@@ -647,21 +868,26 @@ class OpenScienceFramework(base_extension):
                 parent = parent.parent()
         except RuntimeError as e:
             warnings.warn('could not get source node: {}'.format(e))
+        finally:
+            self.project_tree.setUpdatesEnabled(updates_enabled)
 
     def unmark_treewidget_item(self, item):
         """ Removes marking of widget item as linked element """
         # Make all but the last columns to bold
-        columns = self.project_tree.columnCount()
+        columns = self._column_count
+        updates_enabled = self.project_tree.updatesEnabled()
+        self.project_tree.setUpdatesEnabled(False)
         try:
-            font = item.font(0)
-            font.setBold(False)
+            # Keep the item italic if it is the parent of a linked item
+            if item.font(0).italic():
+                font = self._italic_font
+            else:
+                font = self._plain_font
             for i in range(columns-2):
                 item.setFont(i, font)
             # Last column contains remark_text. Make it italic
             item.setText(columns-1, '')
-            font = item.font(columns-1)
-            font.setItalic(False)
-            item.setFont(columns-1, font)
+            item.setFont(columns-1, self._plain_font)
 
             # Reset parent item fonts
             parent = item.parent()
@@ -672,6 +898,8 @@ class OpenScienceFramework(base_extension):
                 parent = parent.parent()
         except RuntimeError as e:
             warnings.warn('could not get source node: {}'.format(e))
+        finally:
+            self.project_tree.setUpdatesEnabled(updates_enabled)
 
     # OpenSesame events
 
@@ -734,12 +962,15 @@ class OpenScienceFramework(base_extension):
         # If a new experiment has been opened, cancel any actions that may be
         # pending of a previous experiment.
         self.manager.clear_pending_requests()
+        # Aborted requests never call back
+        self._file_info_requests.clear()
 
         # Check if exp is linked to OSF.
         # If so, display this information in the OSF explorer.
         if self.experiment.var.has('osf_id'):
-            self.manager.get_file_info(self.experiment.osf_id,
-                                       self.__process_file_info)
+            self.__get_file_info(
+                osf.api_call('file_info', self.experiment.var.osf_id),
+                self.__process_file_info)
         else:
             # Reset GUI if no osf_id is present
             self.set_linked_experiment(None)
@@ -752,8 +983,10 @@ class OpenScienceFramework(base_extension):
             # to get the same kind of information, so construct those accordingly
             # A root level location will contain a colon.
             if not ":" in self.experiment.var.osf_datanode_id:
-                self.manager.get_file_info(self.experiment.osf_datanode_id,
-                                           self.__process_datafolder_info)
+                self.__get_file_info(
+                    osf.api_call('file_info',
+                                 self.experiment.var.osf_datanode_id),
+                    self.__process_datafolder_info)
             else:
                 project_id, repo = self.experiment.var.osf_datanode_id.split(
                     ':')
@@ -777,7 +1010,8 @@ class OpenScienceFramework(base_extension):
             return
 
         # Do not upload the quickrun.csv resulting from a test run
-        if len(data_files) == 1 and os.path.basename(data_files[0]) == "quickrun.csv":
+        if not data_files or (len(data_files) == 1 and
+                              os.path.basename(data_files[0]) == "quickrun.csv"):
             return
 
         # If the autosave checkbox is not checked, ask the user for permission
@@ -813,12 +1047,17 @@ class OpenScienceFramework(base_extension):
     def handle_login(self):
         """ Event fired upon login to OSF """
         if self.sync_check_required and self.experiment.var.has('osf_id'):
-            self.manager.get_file_info(self.experiment.osf_id,
-                                       self.__process_file_info)
+            self.__get_file_info(
+                osf.api_call('file_info', self.experiment.var.osf_id),
+                self.__process_file_info)
         self.info_widget.setEnabled(True)
 
     def handle_logout(self):
         """ Event fired upon logout from the OSF """
+        self._file_info_cache.clear()
+        # Requests that fail after logout never call back, so later requests
+        # for the same url shouldn't wait for them
+        self._file_info_requests.clear()
         self.info_widget.setEnabled(False)
 
     # Private functions
@@ -846,6 +1085,10 @@ class OpenScienceFramework(base_extension):
             self.main_window,
             tokenfile=self.tokenfile,
             notifier=self.notifier)
+        # Recently retrieved file info, as {url: (retrieval time, data)}
+        self._file_info_cache = {}
+        # Pending file info requests, as {url: (request time, [callbacks])}
+        self._file_info_requests = {}
 
         # Init and set up user badge
         icon_size = self.toolbar.iconSize()
@@ -878,8 +1121,7 @@ class OpenScienceFramework(base_extension):
         er = reply.error()
         if er == QtNetwork.QNetworkReply.NoError:
             try:
-                server_settings = json.loads(
-                    safe_decode(reply.readAll().data()))
+                server_settings = json_loads(reply.readAll().data())
             except JSONDecodeError as e:
                 oslogger.warning("Could not parse retrieved OSF settings:"
                                  " {}".format(e))
@@ -899,6 +1141,10 @@ class OpenScienceFramework(base_extension):
 
         # Set-up project tree
         self.project_tree = widgets.ProjectTree(self.manager)
+        # All rows have the same height (marking linked items only changes
+        # the font's weight and style), so Qt doesn't need to compute the
+        # height of every row separately.
+        self.project_tree.setUniformRowHeights(True)
         # Change button availability depending on currently selected item.
         self.project_tree.currentItemChanged.connect(
             self.__set_button_availabilty)
@@ -908,8 +1154,18 @@ class OpenScienceFramework(base_extension):
         self.project_tree.itemDoubleClicked.connect(self.__item_double_clicked)
         # Add extra column for remarks
         self.project_tree.setColumnCount(self.project_tree.columnCount()+1)
+        self._column_count = self.project_tree.columnCount()
         header = self.project_tree.headerItem()
-        header.setText(self.project_tree.columnCount()-1, _(u'Comments'))
+        header.setText(self._column_count-1, _(u'Comments'))
+
+        # Fonts used to mark items that are linked to the experiment
+        self._plain_font = QtGui.QFont(self.project_tree.font())
+        self._bold_font = QtGui.QFont(self._plain_font)
+        self._bold_font.setBold(True)
+        self._italic_font = QtGui.QFont(self._plain_font)
+        self._italic_font.setItalic(True)
+        self._bold_italic_font = QtGui.QFont(self._bold_font)
+        self._bold_italic_font.setItalic(True)
 
         # Save osf_icon for later usage
         self.osf_icon = self.project_tree.get_icon('folder', 'osfstorage')
@@ -950,7 +1206,7 @@ class OpenScienceFramework(base_extension):
 
         # Token file listener writes the token to a json file if it receives
         # a logged_in event and removes this file after logout
-        self.tfl = events.TokenFileListener(self.tokenfile)
+        self.tfl = TokenFileListener(self.tokenfile)
 
         # Add items as listeners to the Notifier sending login and logout events
         self.manager.dispatcher.add_listeners([
@@ -1036,7 +1292,7 @@ class OpenScienceFramework(base_extension):
             context_menu.insertSeparator(firstAction)
         elif kind == "file":
             name = data["attributes"]["name"]
-            if util.check_if_opensesame_file(name, True):
+            if is_opensesame_file(name, os3_only=True):
                 open_experiment = QtWidgets.QAction(QtGui.QIcon.fromTheme('document-open'),
                                                     _(u"Open experiment"), context_menu)
                 open_experiment.triggered.connect(self.__open_osf_experiment)
@@ -1129,39 +1385,13 @@ class OpenScienceFramework(base_extension):
         self.linked_data_value = QtWidgets.QLabel(_(u"Not linked"))
         self.linked_data_value.setStyleSheet("font-style: italic")
 
-        # Widgets for automatically uploading experiment to OSF on save
-        self.widget_autosave_experiment = QtWidgets.QWidget()
-        autosave_exp_layout = QtWidgets.QHBoxLayout()
-
-        self.widget_autosave_experiment.setLayout(autosave_exp_layout)
-        autosave_exp_label = QtWidgets.QLabel(_(u"Upload without asking"))
-        self.checkbox_autosave_experiment = QtWidgets.QCheckBox()
-        self.checkbox_autosave_experiment.setToolTip(_(
-            u"If this box is checked OpenSesame will not ask for permission to\n"
-            "upload an experiment to the OSF and will always do so after an experiment\n"
-            "has been saved."))
-        self.checkbox_autosave_experiment.stateChanged.connect(
-            self.__handle_check_autosave_experiment)
-        autosave_exp_layout.addWidget(self.checkbox_autosave_experiment)
-        autosave_exp_layout.addWidget(autosave_exp_label, QtCore.Qt.AlignLeft)
-        self.widget_autosave_experiment.setDisabled(True)
-
-        # Widgets for the automatic uploading of experiment data to OSF
-        self.widget_autosave_data = QtWidgets.QWidget()
-        autosave_data_layout = QtWidgets.QHBoxLayout()
-        self.widget_autosave_data.setLayout(autosave_data_layout)
-        self.checkbox_autosave_data = QtWidgets.QCheckBox()
-        self.checkbox_autosave_data.setToolTip(_(
-            u"If this box is checked OpenSesame will not ask for permission to\n"
-            "upload collected data to the OSF and will always do so after an experiment\n"
-            "has (successfully) finished."))
-        self.checkbox_autosave_data.stateChanged.connect(
-            self.__handle_check_autosave_data)
-        autosave_data_label = QtWidgets.QLabel(_(u"Upload without asking"))
-        autosave_data_layout.addWidget(self.checkbox_autosave_data)
-        autosave_data_layout.addWidget(
-            autosave_data_label, QtCore.Qt.AlignLeft)
-        self.widget_autosave_data.setDisabled(True)
+        # The widgets for automatically uploading the experiment and its data
+        # are only created once an experiment or data folder is linked. See
+        # __add_autosave_experiment_widget and __add_autosave_data_widget
+        self.widget_autosave_experiment = None
+        self.checkbox_autosave_experiment = None
+        self.widget_autosave_data = None
+        self.checkbox_autosave_data = None
 
         # Add labels to layout
         # First row
@@ -1169,17 +1399,13 @@ class OpenScienceFramework(base_extension):
                               1, 1, QtCore.Qt.AlignRight)
         info_layout.addWidget(self.linked_experiment_value, 1, 2)
         info_layout.addWidget(self.button_unlink_experiment, 1, 3)
-        info_layout.addWidget(self.widget_autosave_experiment, 1, 4)
         # Second row
         info_layout.addWidget(linked_data_label, 2, 1, QtCore.Qt.AlignRight)
         info_layout.addWidget(self.linked_data_value, 2, 2)
         info_layout.addWidget(self.button_unlink_data, 2, 3)
-        info_layout.addWidget(self.widget_autosave_data, 2, 4)
         self.info_widget.setLayout(info_layout)
 
         # Set margins and spacing
-        autosave_exp_layout.setContentsMargins(0, 0, 0, 0)
-        autosave_data_layout.setContentsMargins(0, 0, 0, 0)
         info_layout.setContentsMargins(0, 0, 0, 0)
         info_layout.setVerticalSpacing(6)
 
@@ -1192,6 +1418,57 @@ class OpenScienceFramework(base_extension):
                                        QtWidgets.QSizePolicy.Fixed)
         explorer.main_layout.insertWidget(1, self.info_widget)
 
+    def __add_autosave_experiment_widget(self):
+        """ Adds the widget for automatically uploading the experiment to the
+        OSF on save to the info widget. """
+        self.widget_autosave_experiment, self.checkbox_autosave_experiment = \
+            self.__create_autosave_widget(
+                _(u"If this box is checked OpenSesame will not ask for permission to\n"
+                  "upload an experiment to the OSF and will always do so after an experiment\n"
+                  "has been saved."),
+                self.__handle_check_autosave_experiment)
+        self.info_widget.layout().addWidget(
+            self.widget_autosave_experiment, 1, 4)
+
+    def __add_autosave_data_widget(self):
+        """ Adds the widget for the automatic uploading of experiment data to
+        the OSF to the info widget. """
+        self.widget_autosave_data, self.checkbox_autosave_data = \
+            self.__create_autosave_widget(
+                _(u"If this box is checked OpenSesame will not ask for permission to\n"
+                  "upload collected data to the OSF and will always do so after an experiment\n"
+                  "has (successfully) finished."),
+                self.__handle_check_autosave_data)
+        self.info_widget.layout().addWidget(self.widget_autosave_data, 2, 4)
+
+    def __create_autosave_widget(self, tooltip, slot):
+        """ Creates a (disabled) widget with an 'Upload without asking'
+        checkbox, as shown next to a linked experiment or data folder.
+
+        Parameters
+        ----------
+        tooltip : str
+                The tooltip of the checkbox
+        slot : function
+                The slot to connect to the stateChanged signal of the checkbox
+
+        Returns
+        -------
+        tuple : The widget, and the checkbox it contains
+        """
+        widget = QtWidgets.QWidget()
+        layout = QtWidgets.QHBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        widget.setLayout(layout)
+        checkbox = QtWidgets.QCheckBox()
+        checkbox.setToolTip(tooltip)
+        checkbox.stateChanged.connect(slot)
+        layout.addWidget(checkbox)
+        layout.addWidget(QtWidgets.QLabel(_(u"Upload without asking")),
+                         QtCore.Qt.AlignLeft)
+        widget.setDisabled(True)
+        return widget, checkbox
+
     def __add_help_button(self, explorer):
         explorer.title_widget.layout().addStretch(1)
         help_button = QtWidgets.QPushButton("", explorer.title_widget)
@@ -1206,8 +1483,8 @@ class OpenScienceFramework(base_extension):
         Additionally, it does an extra check to see if the local and remote versions
         of the recently opened experiment are still in sync and displays a choice dialog
         if they are not. """
-        # Parse the response
-        data = json.loads(safe_decode(reply.readAll().data()))
+        # Parse the response, unless it already has been parsed
+        data = self.__parse_reply(reply)
         # Check if structure is valid, and if so, parse experiment's osf path
         # from the data.
         try:
@@ -1234,8 +1511,8 @@ class OpenScienceFramework(base_extension):
         """ Callback for event_open_experiment. Checks if the recently opened
         experiment has a linked data folder on the OSF and displays this information
         accordingly in the OSF explorer. """
-        if isinstance(reply, QtNetwork.QNetworkReply):
-            data = json.loads(safe_decode(reply.readAll().data()))
+        if isinstance(reply, (QtNetwork.QNetworkReply, dict)):
+            data = self.__parse_reply(reply)
             try:
                 osf_folder_path = data['data']['links']['self']
             except KeyError as e:
@@ -1260,20 +1537,18 @@ class OpenScienceFramework(base_extension):
         Checks if buttons should be disabled or not, depending on the currently
         selected tree item. For example, the Open button is only activated if an
         OpenSesame experiment is selected."""
-        # If selection changed to no item, disable all buttons
-        if tree_widget_item is None:
+        # If selection changed to no item, or to a project (which can't be
+        # linked to or opened), disable all buttons
+        if tree_widget_item is None or \
+                tree_widget_item.data(0, QtCore.Qt.UserRole)['type'] == 'nodes':
             self.button_link_exp_to_osf.setDisabled(True)
             self.button_link_data_to_osf.setDisabled(True)
             self.button_open_from_osf.setDisabled(True)
             return
 
         data = tree_widget_item.data(0, QtCore.Qt.UserRole)
-        if data['type'] == 'nodes':
-            name = data["attributes"]["title"]
-            kind = data["attributes"]["category"]
-        if data['type'] == 'files':
-            name = data["attributes"]["name"]
-            kind = data["attributes"]["kind"]
+        name = data["attributes"]["name"]
+        kind = data["attributes"]["kind"]
 
         # The save button should only be present when a folder
         # or an OpenSesame file is selected.
@@ -1294,7 +1569,7 @@ class OpenScienceFramework(base_extension):
 
         # The open button should only be present when
         # an OpenSesame file is selected.
-        if util.check_if_opensesame_file(name, os3_only=True):
+        if is_opensesame_file(name, os3_only=True):
             self.button_open_from_osf.setDisabled(False)
         else:
             self.button_open_from_osf.setDisabled(True)
@@ -1302,21 +1577,45 @@ class OpenScienceFramework(base_extension):
     def __mark_linked_nodes(self):
         """ Callback for self.tree.refreshFinished. Marks all files that are
         connected to the OSF in the tree. """
-
-        iterator = QtWidgets.QTreeWidgetItemIterator(self.project_tree)
-        while(iterator.value()):
-            item = iterator.value()
-            item_data = item.data(0, QtCore.Qt.UserRole)
+        exp_id = self.experiment.var.osf_id \
+            if self.experiment.var.has('osf_id') else None
+        data_id = self.experiment.var.osf_datanode_id \
+            if self.experiment.var.has('osf_datanode_id') else None
+        # Nothing is linked, so there is no need to look at the tree at all
+        if exp_id is None and data_id is None:
+            return
+        # Walk through the tree once, looking for both items. Walking the
+        # children directly is faster than a QTreeWidgetItemIterator, which
+        # needs two calls into Qt for every item.
+        exp_item = data_item = None
+        stack = [self.project_tree.topLevelItem(i)
+                 for i in range(self.project_tree.topLevelItemCount())]
+        while stack:
+            item = stack.pop()
+            item_id = item.data(0, QtCore.Qt.UserRole)['id']
+            if item_id == exp_id:
+                exp_item = item
+            elif item_id == data_id:
+                data_item = item
+            stack.extend(item.child(i) for i in range(item.childCount()))
+        # Repaint the tree only once, after all items have been marked, and
+        # don't emit itemChanged for every changed font while doing so.
+        updates_enabled = self.project_tree.updatesEnabled()
+        self.project_tree.setUpdatesEnabled(False)
+        signals_blocked = self.project_tree.blockSignals(True)
+        try:
             # Mark linked experiment
-            if self.experiment.var.has('osf_id'):
-                if item_data['id'] == self.experiment.var.osf_id:
-                    self.mark_treewidget_item(item, _(u"Linked experiment"))
-                    self.linked_experiment_treewidgetitem = item
-            if self.experiment.var.has('osf_datanode_id'):
-                if item_data['id'] == self.experiment.var.osf_datanode_id:
-                    self.mark_treewidget_item(item, _(u"Linked data folder"))
-                    self.linked_datanode_treewidgetitem = item
-            iterator += 1
+            if exp_item is not None:
+                self.mark_treewidget_item(exp_item, _(u"Linked experiment"))
+                self.linked_experiment_treewidgetitem = exp_item
+            # Mark linked data folder
+            if data_item is not None:
+                self.mark_treewidget_item(data_item, _(u"Linked data folder"))
+                self.linked_datanode_treewidgetitem = data_item
+        finally:
+            self.project_tree.blockSignals(signals_blocked)
+            self.project_tree.setUpdatesEnabled(updates_enabled)
+        self.project_tree.viewport().update()
 
     # PyQt slots
 
@@ -1363,7 +1662,7 @@ class OpenScienceFramework(base_extension):
         if kind == "file":
             name = data["attributes"]["name"]
             # Open if OpenSesame experiment
-            if util.check_if_opensesame_file(name, True):
+            if is_opensesame_file(name, os3_only=True):
                 self.__open_osf_experiment()
             # Download if other type of file
             else:
@@ -1377,7 +1676,7 @@ class OpenScienceFramework(base_extension):
         Retrieves the correct upload(/update) link for an experiment on the OSF.
         And uploads the currently open/linked experiment to that link. """
         # Parse the response
-        data = json.loads(safe_decode(reply.readAll().data()))
+        data = self.__parse_reply(reply)
         # Check if structure is valid, and if so, parse experiment's osf path
         # from the data.
         try:
@@ -1389,18 +1688,11 @@ class OpenScienceFramework(base_extension):
         if not self.main_window.current_path:
             warnings.warn('Attempted to upload an unsaved experiment')
             return
-        # Convert to QFile (to get size info later)
-        file_to_upload = QtCore.QFile(self.main_window.current_path)
+        file_to_upload, progress_dialog_data = self.__prepare_upload(
+            self.main_window.current_path)
         # Add this parameters so OSF knows what we want
         upload_url += '?kind=file'
 
-        # Create a progress dialog to show upload status for large experiments
-        # that take a while to transfer
-        progress_dialog_data = {
-            "filename": file_to_upload.fileName(),
-            "filesize": file_to_upload.size()
-        }
-
         # See if the file info can be updated without refreshing the tree
         if isinstance(self.linked_experiment_treewidgetitem, QtWidgets.QTreeWidgetItem):
             try:
@@ -1439,7 +1731,7 @@ class OpenScienceFramework(base_extension):
         filename = data['attributes']['name']
 
         # If the selected item is not an OpenSesame file, stop.
-        if not util.check_if_opensesame_file(filename, os3_only=True):
+        if not is_opensesame_file(filename, os3_only=True):
             return
 
         # See if a previous folder was set, and if not, try to set
@@ -1531,10 +1823,11 @@ class OpenScienceFramework(base_extension):
 
     # Actions for experiment data
 
-    def __prepare_experiment_data_sync_get_upload_url(self, reply, data_files, node_id):
+    def __prepare_experiment_data_sync_get_upload_url(self, reply, data_files,
+                                                      node_id):
         """ Callback for event_process_data_files(). Constructs the correct api
         endpoint to upload the files to."""
-        data = json.loads(safe_decode(reply.readAll().data()))['data']
+        data = self.__parse_reply(reply)['data']
 
         if isinstance(data, dict):
             # A dictionary represents a subfolder in a repo.
@@ -1548,7 +1841,8 @@ class OpenScienceFramework(base_extension):
         if isinstance(data, list):
             # Probably a listing of project repositories
             # Search for selected repository
-            node = next((item for item in data if item["id"] == node_id), None)
+            repos = {item["id"]: item for item in data}
+            node = repos.get(node_id)
             # In the unlikely case that repository hasn't been found, quit
             if node is None:
                 self.notifier.danger(
@@ -1569,17 +1863,80 @@ class OpenScienceFramework(base_extension):
 
     def __prepare_experiment_data_sync(self, reply, data_files, upload_url):
         """ Callback for __prepare_experiment_data_sync_get_upload_url.
-        Now that the upload url is known, prepare the upload for real."""
+        Now that the upload url is known, prepare the upload for real. Data
+        files of which a copy with the same name is already present on the OSF
+        are first hashed in worker threads, so that they can be skipped if their
+        sha256 hash is the same as that of the copy."""
         # Parse the response
-        data = json.loads(safe_decode(reply.readAll().data()))['data']
+        data = self.__parse_reply(reply)['data']
+
+        # Map the names of the files already present in this folder to their
+        # node data
+        present_files = {f['attributes']['name']: f for f in data}
+        # Collect the hashes of the copies that are already on the OSF. Not all
+        # providers report hashes.
+        remote_hashes = {}
+        for data_file in data_files:
+            file_on_osf = present_files.get(os.path.basename(data_file))
+            try:
+                remote_hash = \
+                    file_on_osf['attributes']['extra']['hashes']['sha256']
+            except (KeyError, TypeError):
+                continue
+            if remote_hash:
+                remote_hashes[data_file] = remote_hash
+        if not remote_hashes:
+            self.__upload_data_files(data_files, upload_url, present_files,
+                                     set())
+            return
 
-        # Generate a list of files already present in this folder
-        present_files = [f['attributes']['name'] for f in data]
+        local_hashes = {}
+        signals = FileHasherSignals(self.main_window)
+
+        def file_hashed(path, digest):
+            local_hashes[path] = digest
+            if len(local_hashes) < len(remote_hashes):
+                return
+            signals.deleteLater()
+            identical = set(path for path, remote_hash in remote_hashes.items()
+                            if local_hashes[path] == remote_hash)
+            self.__upload_data_files(data_files, upload_url, present_files,
+                                     identical)
+
+        signals.hashed.connect(file_hashed, QtCore.Qt.QueuedConnection)
+        pool = QtCore.QThreadPool.globalInstance()
+        for data_file in remote_hashes:
+            pool.start(FileHasher(data_file, signals))
+
+    def __upload_data_files(self, data_files, upload_url, present_files,
+                            identical):
+        """ Uploads the data files, except for those that are already present
+        on the OSF with the same contents. The user is asked whether other
+        files that are already present should be overwritten.
+
+        Parameters
+        ----------
+        data_files : list
+                The paths to the data files to upload
+        upload_url : str
+                The url to upload new files to
+        present_files : dict
+                The node data of the files already present at the linked
+                location, with their names as keys
+        identical : set
+                The paths of the data files that are already present on the OSF
+                with the same sha256 hash
+        """
+        skipped = []
         # Process all the datafiles to be uploaded
         for data_file in data_files:
-            # Check if data file is already present on the server
             filename = os.path.basename(data_file)
-            if filename in present_files:
+            if data_file in identical:
+                skipped.append(filename)
+                continue
+            # Check if data file is already present on the server
+            file_on_osf = present_files.get(filename)
+            if file_on_osf is not None:
                 reply = QtWidgets.QMessageBox.question(
                     None,
                     _(u"Please confirm"),
@@ -1589,30 +1946,20 @@ class OpenScienceFramework(base_extension):
                 )
                 if reply == QtWidgets.QMessageBox.No:
                     continue
-                # Get the node data for the duplicate file found on OSF. For this
-                # we need to iterate over the list of dictionaries provided by the
-                # OSF and find the relevant node.
-                file_on_osf = next((item for item in data if
-                                    item['attributes']['name'] == filename), None)
-                file_upload_url = file_on_osf['links']['upload']
-                upload_url = "{}?kind=file".format(file_upload_url)
+                # Update the existing file
+                file_upload_url = "{}?kind=file".format(
+                    file_on_osf['links']['upload'])
                 # Search for index of node to be replaced in tree
                 update_index = self.project_tree.find_item(
                     self.linked_datanode_treewidgetitem, 0, filename)
             else:
-                upload_url = "{}?kind=file&name={}".format(
+                # Add a new file to the folder
+                file_upload_url = "{}?kind=file&name={}".format(
                     upload_url, filename)
                 update_index = None
 
-            # Convert to QFile (to get size info later)
-            file_to_upload = QtCore.QFile(data_file)
-
-            # Create a progress dialog to show upload status for large experiments
-            # that take a while to transfer
-            progress_dialog_data = {
-                "filename": file_to_upload.fileName(),
-                "filesize": file_to_upload.size()
-            }
+            file_to_upload, progress_dialog_data = self.__prepare_upload(
+                data_file)
 
             # See if the file info can be updated without refreshing the tree
             if isinstance(self.linked_datanode_treewidgetitem, QtWidgets.QTreeWidgetItem):
@@ -1624,7 +1971,7 @@ class OpenScienceFramework(base_extension):
                 refresh_node = None
 
             self.manager.upload_file(
-                upload_url,
+                file_upload_url,
                 file_to_upload,
                 progressDialog=progress_dialog_data,
                 finishedCallback=self.project_explorer._upload_finished,
@@ -1635,6 +1982,13 @@ class OpenScienceFramework(base_extension):
                           "Framework".format(filename))
             )
 
+        if skipped:
+            self.notifier.info(
+                _(u'Data files not uploaded'),
+                _(u'These data files are already present on the Open Science '
+                  u'Framework and were not uploaded again: {}').format(
+                    u', '.join(skipped)))
+
     # (Un)linking of experiments
 
     def __link_experiment_to_osf(self):
@@ -1671,9 +2025,6 @@ class OpenScienceFramework(base_extension):
         upload_url = data['links']['upload']
         experiment_filename = os.path.split(self.main_window.current_path)[1]
 
-        # Convert to QFile (to get size info later)
-        file_to_upload = QtCore.QFile(self.main_window.current_path)
-
         # See if file is already present in this folder
         index_if_present = self.project_explorer.tree.find_item(
             selected_item, 0, experiment_filename)
@@ -1704,12 +2055,8 @@ class OpenScienceFramework(base_extension):
             upload_url = old_item_data['links']['upload']
             upload_url += '?kind=file'
 
-        # Create a progress dialog to show upload status for large experiments
-        # that take a while to transfer
-        progress_dialog_data = {
-            "filename": file_to_upload.fileName(),
-            "filesize": file_to_upload.size()
-        }
+        file_to_upload, progress_dialog_data = self.__prepare_upload(
+            self.main_window.current_path)
 
         self.manager.upload_file(
             upload_url,
@@ -1729,6 +2076,9 @@ class OpenScienceFramework(base_extension):
         the tree and don't supply 'new_item_data' to this function. In this
         case, this function simply returns. """
 
+        # The info of the uploaded experiment has changed on the OSF
+        self._file_info_cache.clear()
+
         # The complete new tree_widget_item should also be available as the
         # 'new_item' kwarg
 
@@ -1878,12 +2228,119 @@ class OpenScienceFramework(base_extension):
         """ Callback for __prepare_experiment_sync and __prepare_experiment_data_sync.
         Simply notifies if the syncing operation completed successfully. """
         # If experiment has been synced, set the newly returned item
+        # The info of the uploaded files has changed on the OSF
+        self._file_info_cache.clear()
         new_item = kwargs.pop('new_item', None)
         if new_item:
             self.linked_experiment_treewidgetitem = new_item
             self.__mark_linked_nodes()
         self.notifier.success(_(u'Sync success'), message)
 
+    def __parse_reply(self, reply):
+        """ Parses the JSON data of a reply from the OSF.
+
+        Parameters
+        ----------
+        reply : QtNetwork.QNetworkReply or dict
+                The reply to parse. Data that has already been parsed is
+                returned as is.
+
+        Returns
+        -------
+        dict : The parsed data
+        """
+        if not isinstance(reply, QtNetwork.QNetworkReply):
+            return reply
+        return json_loads(reply.readAll().data())
+
+    def __get_file_info(self, osf_url, callback):
+        """ Retrieves the info of a node from the OSF and passes it to callback
+        as a dict. Info that was retrieved less than file_info_ttl seconds ago
+        is reused, so that checking the same linked node several times in a row
+        (e.g. on opening an experiment and then showing the explorer) only
+        results in a single request. If the info is already being retrieved,
+        callback waits for that request to finish instead of sending another
+        one.
+
+        Parameters
+        ----------
+        osf_url : str
+                The API endpoint of the node
+        callback : function
+                The function to pass the parsed info to
+        """
+        cached = self._file_info_cache.get(osf_url)
+        if cached is not None and \
+                time.time() - cached[0] < self.file_info_ttl:
+            # Still call back asynchronously, like a network request would
+            QtCore.QTimer.singleShot(0, functools.partial(callback, cached[1]))
+            return
+        # If a request for this url is pending, wait for it. Requests that fail
+        # are removed by __file_info_failed, but don't wait for requests that
+        # have taken longer than file_info_ttl seconds in any case.
+        pending = self._file_info_requests.get(osf_url)
+        if pending is not None and \
+                time.time() - pending[0] < self.file_info_ttl:
+            pending[1].append(callback)
+            return
+        self._file_info_requests[osf_url] = (time.time(), [callback])
+        self.manager.get(
+            osf_url,
+            self.__file_info_received,
+            osf_url=osf_url,
+            errorCallback=functools.partial(self.__file_info_failed,
+                                            failed_url=osf_url)
+        )
+
+    def __file_info_received(self, reply, osf_url, *args, **kwargs):
+        """ Callback for __get_file_info. Caches the retrieved info and passes
+        it on to all callbacks that are waiting for it. If a callback raises an
+        exception, the other callbacks are still called, after which the first
+        exception is raised again. """
+        data = self.__parse_reply(reply)
+        self._file_info_cache[osf_url] = (time.time(), data)
+        _, callbacks = self._file_info_requests.pop(osf_url, (0, []))
+        error = None
+        for callback in callbacks:
+            try:
+                callback(data)
+            except Exception as e:
+                if error is None:
+                    error = e
+        if error is not None:
+            raise error
+
+    def __file_info_failed(self, reply, failed_url, *args, **kwargs):
+        """ Error callback for __get_file_info. Forgets the failed request, so
+        that the next request for the same url is sent again instead of waiting
+        for a reply that never comes. """
+        self._file_info_requests.pop(failed_url, None)
+
+    def __prepare_upload(self, path):
+        """ Prepares a local file for uploading with manager.upload_file.
+
+        Parameters
+        ----------
+        path : str
+                The path to the file to upload
+
+        Returns
+        -------
+        tuple : A QFile for the file to upload, and the data for the progress
+        dialog that shows the upload status of files that take a while to
+        transfer. The latter is None for files smaller than
+        progress_dialog_threshold, which are uploaded without a dialog.
+        """
+        filesize = os.path.getsize(path)
+        if filesize < self.progress_dialog_threshold:
+            progress_dialog_data = None
+        else:
+            progress_dialog_data = {
+                "filename": path,
+                "filesize": filesize
+            }
+        return QtCore.QFile(path), progress_dialog_data
+
     def __get_selected_node_for_link(self):
         """ Checks if current selection is valid for linking operation, which
         can only be done to folders. Returns the selected tree item containing